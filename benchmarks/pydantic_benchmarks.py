@@ -0,0 +1,271 @@
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import timeit
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+import pydantic
+from pydantic import TypeAdapter, create_model
+
+'''
+Microbenchmarks for the pydantic features our request schemas use.
+
+It measures the models from pydantic_tutorial (field/model validators, computed_field, nested models,
+model_dump with include/exclude) and the production schemas (UserInput from improved_fast_api_model,
+Patient and PatientUpdate from patient_management_system):
+
+- single objects: model_validate vs model_validate_json, model_dump vs model_dump_json
+- batches through TypeAdapter(List[Model]): validate_python vs validate_json, dump_python vs dump_json
+
+The tutorial validator and computed_field models also have an EmailStr field, whose validation costs far
+more than the features themselves. They are run again with a plain str email (.str_email) and as a control
+with the same fields but no validators / computed field (.control), and the differences are reported as
+the cost of EmailStr, the validators and computed_field.
+
+Every run can be appended to a history file (--save). Each case is compared with its latest saved result
+from runs with the same batch size, python and pydantic versions, and a case that got slower than
+--threshold is reported as a regression (exit code 1), so schema changes that slow down validation are
+caught. Saving a --filter run only updates the baseline of the cases it ran. A run with regressions is
+only saved (and so becomes the new baseline) when --accept is given.
+
+Usage (from the repository root):
+    python benchmarks/pydantic_benchmarks.py
+    python benchmarks/pydantic_benchmarks.py --filter UserInput --save
+'''
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_HISTORY = os.path.join(ROOT, 'benchmarks', 'history.jsonl')
+
+
+@contextlib.contextmanager
+def working_directory(path: str):
+    # the apps open their data files with paths relative to their own folder
+    previous = os.getcwd()
+    sys.path.insert(0, path)
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+        sys.path.remove(path)
+
+
+def load_module(name: str, path: str):
+    # the tutorial files are scripts that print their examples, so hide that output
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    with contextlib.redirect_stdout(io.StringIO()):
+        spec.loader.exec_module(module)
+    return module
+
+
+def model_cases(label: str, model_cls, data: dict, batch_size: int, **dump_kwargs) -> Dict[str, Callable]:
+    raw_json = json.dumps(data)
+    obj = model_cls.model_validate(data)
+
+    adapter = TypeAdapter(List[model_cls])
+    batch_data = [data] * batch_size
+    batch_json = json.dumps(batch_data).encode()
+    batch_objects = adapter.validate_python(batch_data)
+    # on a list adapter include/exclude keys are list indices, '__all__' applies them to every item
+    batch_kwargs = {key: {'__all__': value} if key in ('include', 'exclude') else value
+                    for key, value in dump_kwargs.items()}
+
+    # make sure the batch cases do the same work as the single object ones
+    expected = [obj.model_dump(**dump_kwargs)] * batch_size
+    if adapter.dump_python(batch_objects, **batch_kwargs) != expected:
+        raise ValueError(f'{label}: batch dump_python does not match model_dump')
+    expected_json = [json.loads(obj.model_dump_json(**dump_kwargs))] * batch_size
+    if json.loads(adapter.dump_json(batch_objects, **batch_kwargs)) != expected_json:
+        raise ValueError(f'{label}: batch dump_json does not match model_dump_json')
+
+    return {
+        f'{label}.model_validate': lambda: model_cls.model_validate(data),
+        f'{label}.model_validate_json': lambda: model_cls.model_validate_json(raw_json),
+        f'{label}.model_dump': lambda: obj.model_dump(**dump_kwargs),
+        f'{label}.model_dump_json': lambda: obj.model_dump_json(**dump_kwargs),
+        f'{label}.batch.validate_python': lambda: adapter.validate_python(batch_data),
+        f'{label}.batch.validate_json': lambda: adapter.validate_json(batch_json),
+        f'{label}.batch.dump_python': lambda: adapter.dump_python(batch_objects, **batch_kwargs),
+        f'{label}.batch.dump_json': lambda: adapter.dump_json(batch_objects, **batch_kwargs)
+    }
+
+
+def with_str_email(model_cls):
+    # same model (validators, computed fields) with a plain str email, EmailStr validation alone
+    # costs far more than the features we want to measure
+    return type(f'{model_cls.__name__}StrEmail', (model_cls,), {'__annotations__': {'email': str}})
+
+
+def control_model(model_cls):
+    # the same fields with a plain str email, but none of the validators or computed fields
+    fields = {
+        name: (str if name == 'email' else field.annotation, field)
+        for name, field in model_cls.model_fields.items()
+    }
+    return create_model(f'{model_cls.__name__}Control', **fields)
+
+
+# (case, control, feature): the difference between the two is the cost of the feature
+FEATURE_COSTS = [
+    ('tutorial.field_validators', 'tutorial.field_validators.str_email', 'EmailStr'),
+    ('tutorial.field_validators.str_email', 'tutorial.field_validators.control', 'field/model validators'),
+    ('tutorial.computed_field.str_email', 'tutorial.computed_field.control', 'computed_field')
+]
+FEATURE_COST_OPS = ['model_validate', 'model_validate_json', 'model_dump', 'model_dump_json']
+
+
+def build_cases(batch_size: int) -> Dict[str, Callable]:
+    tutorial = os.path.join(ROOT, 'pydantic_tutorial')
+    validators = load_module('tutorial_field_validators', os.path.join(tutorial, '3_fiels_validators.py'))
+    computed = load_module('tutorial_computed_field', os.path.join(tutorial, '4_computed_field.py'))
+    nested = load_module('tutorial_nested_model', os.path.join(tutorial, '5_nested_model.py'))
+    serialization = load_module('tutorial_serialization', os.path.join(tutorial, '6_serialization.py'))
+
+    with working_directory(os.path.join(ROOT, 'improved_fast_api_model')):
+        from schema.user_input import UserInput
+
+    with working_directory(os.path.join(ROOT, 'patient_management_system')):
+        patient_app = load_module('patient_management_main', 'main.py')
+
+    user_input = {
+        'age': 30, 'weight': 70.0, 'height': 170.0, 'income_lpa': 10.0,
+        'smoker': False, 'city': 'Pune', 'occupation': 'private_job'
+    }
+    patient = {
+        'id': 'P001', 'name': 'John Doe', 'age': 30, 'city': 'New York',
+        'gender': 'Male', 'weight': 70.5, 'height': 1.75
+    }
+    patient_update = {'age': 31, 'weight': 72.0}
+
+    cases = {}
+    cases.update(model_cases('tutorial.field_validators', validators.Patient, validators.patient_info, batch_size))
+    cases.update(model_cases('tutorial.computed_field', computed.Patient, computed.patient_info, batch_size))
+    # variants without EmailStr, and controls without the validators / computed field (see FEATURE_COSTS)
+    for label, module in [('tutorial.field_validators', validators), ('tutorial.computed_field', computed)]:
+        cases.update(model_cases(f'{label}.str_email', with_str_email(module.Patient), module.patient_info, batch_size))
+        cases.update(model_cases(f'{label}.control', control_model(module.Patient), module.patient_info, batch_size))
+    cases.update(model_cases('tutorial.nested_model', nested.Patient, nested.patient_info, batch_size))
+    cases.update(model_cases('tutorial.serialization_include', serialization.Patient, serialization.patient_info, batch_size,
+                             include={'name': ..., 'age': ..., 'address': {'country', 'state'}}))
+    # the same way the apps serialize these models
+    cases.update(model_cases('UserInput', UserInput, user_input, batch_size))
+    cases.update(model_cases('Patient', patient_app.Patient, patient, batch_size, exclude={'id'}))
+    cases.update(model_cases('PatientUpdate', patient_app.PatientUpdate, patient_update, batch_size, exclude_unset=True))
+    return cases
+
+
+def measure(func: Callable, min_time: float, repeat: int) -> float:
+    # best time per call over `repeat` rounds, each round running for at least `min_time` seconds
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    number = max(number, int(number * min_time / max(elapsed, 1e-9)))
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def load_baseline(history_path: str, batch_size: int) -> Dict[str, float]:
+    # latest saved result for every case, from runs with the same batch size, python and pydantic
+    # versions; built per case so that a saved --filter run only replaces the cases it measured
+    baseline = {}
+    if not os.path.exists(history_path):
+        return baseline
+    with open(history_path, 'r') as f:
+        for line in f:
+            if line.strip():
+                run = json.loads(line)
+                if (run['batch_size'] == batch_size and run['python'] == platform.python_version()
+                        and run['pydantic'] == pydantic.VERSION):
+                    baseline.update(run['results'])
+    return baseline
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pydantic validation and serialization microbenchmarks')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Number of objects in the TypeAdapter batch cases')
+    parser.add_argument('--filter', default=None, help='Only run cases whose name contains this text')
+    parser.add_argument('--min-time', type=float, default=0.2, help='Minimum seconds per timing round')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of timing rounds, the best one is kept')
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help='JSON lines file with the previous runs')
+    parser.add_argument('--save', action='store_true', help='Append this run to the history file')
+    parser.add_argument('--accept', action='store_true',
+                        help='Save the run with --save even if it has regressions, making it the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='Flag a case as regressed when it is this much slower than the baseline (0.15 = 15%%)')
+    args = parser.parse_args()
+
+    cases = build_cases(args.batch_size)
+    if args.filter:
+        cases = {name: func for name, func in cases.items() if args.filter in name}
+
+    baseline_results = load_baseline(args.history, args.batch_size)
+    compared = [name for name in cases if name in baseline_results]
+    if compared:
+        print(f'Comparing {len(compared)} of {len(cases)} case(s) with their latest saved result')
+
+    results = {}
+    regressions = []
+    print(f"{'case':<60} {'us/op':>12} {'ops/s':>14} {'vs baseline':>12}")
+    for name, func in cases.items():
+        seconds = measure(func, args.min_time, args.repeat)
+        results[name] = seconds
+
+        change = ''
+        if name in baseline_results:
+            ratio = seconds / baseline_results[name] - 1
+            change = f'{ratio:+.1%}'
+            if ratio > args.threshold:
+                regressions.append((name, ratio))
+                change += ' !'
+        print(f'{name:<60} {seconds * 1e6:>12.2f} {1 / seconds:>14,.0f} {change:>12}')
+
+    costs = [
+        (feature, op, results[f'{case}.{op}'] - results[f'{control}.{op}'])
+        for case, control, feature in FEATURE_COSTS for op in FEATURE_COST_OPS
+        if f'{case}.{op}' in results and f'{control}.{op}' in results
+    ]
+    if costs:
+        print(f"\n{'feature cost (case - control)':<60} {'op':<20} {'us/op':>10}")
+        for feature, op, seconds in costs:
+            print(f'{feature:<60} {op:<20} {seconds * 1e6:>10.2f}')
+        print()
+
+    if args.save and regressions and not args.accept:
+        print('Not saving the run because it has regressions, use --accept to save it as the new baseline')
+    elif args.save:
+        run = {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'pydantic': pydantic.VERSION,
+            'batch_size': args.batch_size,
+            'results': results
+        }
+        with open(args.history, 'a') as f:
+            f.write(json.dumps(run) + '\n')
+        print(f'Saved run to {args.history}')
+
+    if regressions:
+        print(f'\n{len(regressions)} case(s) slower than the baseline by more than {args.threshold:.0%}:')
+        for name, ratio in regressions:
+            print(f'  {name}: {ratio:+.1%}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
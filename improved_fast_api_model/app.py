@@ -1,7 +1,8 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import JSONResponse
 from schema.user_input import UserInput
-from model.model import MODEL_VERSION, model, model_prediction
+from model.model import MODEL_VERSION
+from model.registry import registry, ModelNotFoundError
 from schema.prediction_response import PredictionResponse
 from typing import Dict
 
@@ -24,14 +25,15 @@ def health_check():
     return JSONResponse(status_code=200, content={
         'status': 'API is healthy and running.',
         'model_version': MODEL_VERSION,
-        'model_loaded': True if model else False
+        # models are loaded lazily, so report whether the model can be served and, separately,
+        # whether it is in memory right now
+        'model_loaded': registry.is_available('premium_category'),
+        'model_resident': registry.info('premium_category')['loaded']
         })
 
-# post route for the model
-@app.post('/predict', response_model=PredictionResponse)
-def predict_premium(data: UserInput):
 
-    user_input = {
+def model_input(data: UserInput) -> Dict:
+    return {
         'bmi': data.bmi,
         'age_group': data.age_group,
         'lifestyle_risk': data.lifestyle_risk,
@@ -40,12 +42,62 @@ def predict_premium(data: UserInput):
         'occupation': data.occupation
     }
 
+# post route for the model
+@app.post('/predict', response_model=PredictionResponse)
+def predict_premium(data: UserInput):
+
+    user_input = model_input(data)
+
     try:
 
-        prediction = model_prediction(user_input)
+        prediction = registry.predict('premium_category', user_input)
 
         return JSONResponse(status_code=200, content={'response': prediction})
     
     except Exception as e:
 
-        return JSONResponse(status_code=500, content=str(e))
\ No newline at end of file
+        return JSONResponse(status_code=500, content=str(e))
+
+
+# multi-model host
+'''
+All the models registered in config/models.py are served from this one app under /models/{name}.
+Models are loaded on first use and evicted (least recently used first) when the loaded models
+go above the memory budget, so one worker does not need to hold every model in memory.
+'''
+@app.get('/models')
+def list_models():
+    return JSONResponse(status_code=200, content=registry.summary())
+
+
+@app.get('/models/{name}')
+def model_info(name: str):
+    try:
+        return JSONResponse(status_code=200, content=registry.info(name))
+    except ModelNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Model {name} not found.")
+
+
+@app.post('/models/{name}/warmup')
+def warmup_model(name: str):
+    try:
+        return JSONResponse(status_code=200, content=registry.warmup(name))
+    except ModelNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Model {name} not found.")
+
+
+@app.post('/models/{name}/predict', response_model=PredictionResponse)
+def predict_with_model(name: str, data: UserInput):
+
+    try:
+
+        prediction = registry.predict(name, model_input(data))
+
+        return JSONResponse(status_code=200, content={'response': prediction})
+
+    except ModelNotFoundError:
+        raise HTTPException(status_code=404, detail=f"Model {name} not found.")
+
+    except Exception as e:
+
+        return JSONResponse(status_code=500, content=str(e))
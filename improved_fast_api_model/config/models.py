@@ -0,0 +1,37 @@
+import os
+from model.model import MODEL_VERSION
+
+'''
+Models served by the multi-model host under /models/{name}/predict.
+
+Each model is only loaded on its first request (or an explicit warmup), so a worker does not
+pay for the memory of models it never serves. When the loaded models would go above
+MODEL_MEMORY_BUDGET_MB, the least recently used ones are evicted and loaded again on demand.
+'''
+MODEL_MEMORY_BUDGET_MB = float(os.getenv('MODEL_MEMORY_BUDGET_MB', '512'))
+
+# optional precompiled mode (model/compiled_forest.py): the forest is turned into per-segment lookup tables
+# when the model is loaded. Loading takes a few seconds longer and uses more memory, predictions are much faster.
+# Can also be turned on for a single model with 'precompiled': True in its entry below.
+PRECOMPILE_MODELS = os.getenv('PRECOMPILE_MODELS', 'false').lower() == 'true'
+
+# fast_api_and_ml_model/model.pkl is byte-identical to model/model.pkl, so that service is covered by
+# 'premium_category' and is not registered a second time (it would count against the budget twice).
+# New models are served by adding an entry here.
+MODEL_REGISTRY = {
+    'premium_category': {
+        'path': 'model/model.pkl',
+        'version': MODEL_VERSION,
+        'description': 'Insurance premium category classifier'
+    }
+}
+
+# sample request used to warm a model up right after it is loaded
+WARMUP_INPUT = {
+    'bmi': 24.2,
+    'age_group': 'adult',
+    'lifestyle_risk': 'low',
+    'city_tier': 1,
+    'income_lpa': 10.0,
+    'occupation': 'private_job'
+}
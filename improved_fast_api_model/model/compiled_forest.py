@@ -0,0 +1,174 @@
+import math
+import time
+from bisect import bisect_left
+from itertools import product
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder
+
+from model.model import model_prediction, prediction_response
+
+'''
+Precompiled ("specialized") version of the RandomForest pipeline.
+
+Four of the six inputs are small categoricals (age_group, lifestyle_risk, occupation, city_tier), which
+gives only 252 combinations, and only bmi and income_lpa are continuous. So at load time, for every
+combination (segment) we:
+
+1. walk every tree with the one-hot values of the segment fixed, which prunes all the categorical
+   splits and leaves only the bmi / income_lpa thresholds that can still be reached,
+2. split the (bmi, income_lpa) plane at those thresholds into a grid of cells; within a cell every
+   tree ends in the same leaf, so the forest output is constant,
+3. evaluate model.predict_proba once on one point per cell and store the result in a table.
+
+A prediction is then a dict lookup for the segment plus one bisect per numeric feature.
+
+The trees compare float32 inputs (sklearn casts X to float32) with float64 thresholds and go left
+when x <= threshold, so the lookup casts the input to float32 and uses bisect_left the same way. Since
+the table values come from predict_proba itself, the probabilities are identical to the pipeline.
+Inputs with unknown categories (or non finite numbers) fall back to the full pipeline.
+'''
+
+
+def _float32(value: float) -> float:
+    return float(np.float32(value))
+
+
+def _cell_points(thresholds: np.ndarray) -> np.ndarray:
+    # one float32 value inside every cell: (-inf, t0], (t0, t1], ..., (t_last, inf)
+    points = []
+    for threshold in thresholds:
+        point = np.float32(threshold)
+        if point > threshold:
+            point = np.nextafter(point, np.float32(-np.inf))
+        points.append(point)
+    last = np.float32(thresholds[-1]) if len(thresholds) else np.float32(0)
+    if len(thresholds) and last <= thresholds[-1]:
+        last = np.nextafter(last, np.float32(np.inf))
+    points.append(last)
+    return np.array(points, dtype=np.float32)
+
+
+def _is_passthrough(transformer) -> bool:
+    # a fitted ColumnTransformer stores 'passthrough' as an identity FunctionTransformer
+    if isinstance(transformer, str):
+        return transformer == 'passthrough'
+    return isinstance(transformer, FunctionTransformer) and transformer.func is None
+
+
+def _reachable_thresholds(tree, encoded_row: np.ndarray, numeric_idx: list, found: list):
+    # walk the tree with the categorical (one-hot) values fixed and collect the numeric splits left
+    stack = [0]
+    while stack:
+        node = stack.pop()
+        left, right = tree.children_left[node], tree.children_right[node]
+        if left == right:
+            continue
+        feature, threshold = tree.feature[node], tree.threshold[node]
+        if feature in numeric_idx:
+            found[numeric_idx.index(feature)].add(threshold)
+            stack.extend((left, right))
+        elif encoded_row[feature] <= threshold:
+            stack.append(left)
+        else:
+            stack.append(right)
+
+
+class CompiledForest:
+
+    def __init__(self, model):
+        start = time.perf_counter()
+        self.model = model
+        self.classes_ = model.classes_
+
+        preprocessor, forest = model.steps[0][1], model.steps[-1][1]
+        if not isinstance(preprocessor, ColumnTransformer) or not isinstance(forest, RandomForestClassifier):
+            raise ValueError('Only ColumnTransformer + RandomForestClassifier pipelines can be precompiled')
+
+        encoders = [(trans, cols) for _, trans, cols in preprocessor.transformers_ if isinstance(trans, OneHotEncoder)]
+        if len(encoders) != 1:
+            raise ValueError('Expected exactly one OneHotEncoder in the preprocessor')
+        encoder, self.categorical = encoders[0]
+        self.categorical = list(self.categorical)
+        self.numeric = [col for col in model.feature_names_in_ if col not in self.categorical]
+        if len(self.numeric) != 2:
+            raise ValueError(f'Expected two numeric features, got {self.numeric}')
+
+        # the lookup bisects the raw inputs against the tree thresholds, which only works when the
+        # numeric columns reach the forest unchanged (no scaler, imputer, ...)
+        input_columns = list(model.feature_names_in_)
+        passthrough_columns = set()
+        for _, transformer, cols in preprocessor.transformers_:
+            if _is_passthrough(transformer):
+                passthrough_columns.update(input_columns[col] if isinstance(col, (int, np.integer)) else col for col in cols)
+        if not set(self.numeric) <= passthrough_columns:
+            raise ValueError(f'Numeric features {self.numeric} must be passed through to the forest unchanged')
+
+        feature_names = list(preprocessor.get_feature_names_out())
+        numeric_idx = [
+            next(i for i, name in enumerate(feature_names) if name == col or name.endswith(f'__{col}'))
+            for col in self.numeric
+        ]
+
+        self.segments = {}
+        shared_tables = {}
+        for segment in product(*[categories.tolist() for categories in encoder.categories_]):
+            row = dict(zip(self.categorical, segment), **{col: 0.0 for col in self.numeric})
+            encoded_row = preprocessor.transform(pd.DataFrame([row], columns=model.feature_names_in_))[0]
+
+            found = [set(), set()]
+            for estimator in forest.estimators_:
+                _reachable_thresholds(estimator.tree_, encoded_row, numeric_idx, found)
+            x_thresholds, y_thresholds = (np.array(sorted(values)) for values in found)
+
+            # evaluate the forest once per cell, on the already encoded rows
+            x_points, y_points = _cell_points(x_thresholds), _cell_points(y_thresholds)
+            grid = np.repeat(encoded_row[np.newaxis, :], len(x_points) * len(y_points), axis=0)
+            grid[:, numeric_idx[0]] = np.repeat(x_points, len(y_points))
+            grid[:, numeric_idx[1]] = np.tile(y_points, len(x_points))
+            table = forest.predict_proba(grid).reshape(len(x_points), len(y_points), -1)
+
+            # segments whose pruned forests turn out identical share one table
+            key = (x_thresholds.tobytes(), y_thresholds.tobytes(), table.tobytes())
+            if key not in shared_tables:
+                shared_tables[key] = (x_thresholds.tolist(), y_thresholds.tolist(), table)
+            self.segments[segment] = shared_tables[key]
+
+        self.n_tables = len(shared_tables)
+        self.nbytes = sum(
+            table.nbytes + 8 * (len(x_thresholds) + len(y_thresholds))
+            for x_thresholds, y_thresholds, table in shared_tables.values()
+        )
+        self.build_ms = (time.perf_counter() - start) * 1000
+
+    def predict_proba_one(self, user_input: dict):
+        # returns None when the input can not be answered from the tables
+        segment = self.segments.get(tuple(user_input[col] for col in self.categorical))
+        if segment is None:
+            return None
+        x, y = user_input[self.numeric[0]], user_input[self.numeric[1]]
+        if not (math.isfinite(x) and math.isfinite(y)):
+            return None
+        x_thresholds, y_thresholds, table = segment
+        return table[bisect_left(x_thresholds, _float32(x)), bisect_left(y_thresholds, _float32(y))]
+
+    def info(self) -> dict:
+        return {
+            'segments': len(self.segments),
+            'tables': self.n_tables,
+            'table_bytes': self.nbytes,
+            'build_ms': round(self.build_ms, 3)
+        }
+
+
+def compiled_prediction(compiled: CompiledForest, user_input: dict):
+
+    probabilities = compiled.predict_proba_one(user_input)
+    if probabilities is None:
+        # unknown category, use the full pipeline (which raises the usual error for it)
+        return model_prediction(compiled.model, user_input)
+
+    return prediction_response(compiled.classes_, probabilities)
@@ -1,4 +1,4 @@
-import pickle
+import numpy as np
 import pandas as pd
 from typing import Dict
 
@@ -11,32 +11,35 @@ In real world application, we should store the model version in a separate file
 '''
 MODEL_VERSION = '1.0.0'
 
-try:
-    with open('model/model.pkl', 'rb') as f:
-        model = pickle.load(f)
-except Exception as e:
-    model = None
-    print(f"Error loading model: {e}")
-    
-class_labels = model.classes_.tolist()
-
-
-def model_prediction(user_input: dict):
+'''
+The model itself is no longer loaded here at import time. Models are registered in config/models.py
+and loaded lazily by the registry in model/registry.py, which passes the loaded model to model_prediction.
+'''
 
-    df = pd.DataFrame([user_input])
 
-    # Predict the class
-    predicted_class = model.predict(df)[0]
+def prediction_response(classes, probabilities):
+    # response shared by model_prediction and the precompiled path in model/compiled_forest.py
 
-    # Get probabilities for all classes
-    probabilities = model.predict_proba(df)[0]
+    # Predict the class, the forest predicts the class with the highest probability
+    predicted_class = classes[int(np.argmax(probabilities))]
     confidence = max(probabilities)
-    
+
     # Create mapping: {class_name: probability}
+    class_labels = classes.tolist()
     class_probs = dict(zip(class_labels, map(lambda p: round(p, 4), probabilities)))
 
     return {
         "predicted_category": predicted_class,
         "confidence": round(confidence, 4),
         "class_probabilities": class_probs
-    }
\ No newline at end of file
+    }
+
+
+def model_prediction(model, user_input: dict):
+
+    df = pd.DataFrame([user_input])
+
+    # Get probabilities for all classes
+    probabilities = model.predict_proba(df)[0]
+
+    return prediction_response(model.classes_, probabilities)
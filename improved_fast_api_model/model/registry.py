@@ -0,0 +1,210 @@
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict
+
+from config.models import MODEL_REGISTRY, MODEL_MEMORY_BUDGET_MB, PRECOMPILE_MODELS, WARMUP_INPUT
+from model.model import model_prediction
+from model.compiled_forest import CompiledForest, compiled_prediction
+
+'''
+Registry for the multi-model host.
+
+- Models are loaded lazily, the first time they are used (prediction or warmup).
+- Loaded models are kept in an OrderedDict in least-recently-used order. Before loading a new model,
+  idle models are evicted from the front until the new one fits in the memory budget.
+- The memory of a model is estimated by the size of its pickle file. This is not the exact number of
+  bytes the object takes once unpickled, but it is cheap to get and scales the same way.
+  Precompiled models also count the size of their lookup tables.
+
+A request that already holds a reference to an evicted model keeps using it; eviction only drops
+the registry's reference, so the memory is freed once that request is done.
+'''
+
+
+class ModelNotFoundError(KeyError):
+    pass
+
+
+class ModelMetrics:
+
+    # predictions run in FastAPI's threadpool, so every update and read goes through the lock
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.predictions = 0
+        self.errors = 0
+        self.total_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self.last_latency_ms = None
+        self.loads = 0
+        self.evictions = 0
+        self.last_load_ms = None
+        self.last_warmup_ms = None
+
+    def record_prediction(self, latency_ms: float):
+        with self.lock:
+            self.predictions += 1
+            self.total_latency_ms += latency_ms
+            self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+            self.last_latency_ms = latency_ms
+
+    def record_error(self):
+        with self.lock:
+            self.errors += 1
+
+    def record_load(self, load_ms: float):
+        with self.lock:
+            self.loads += 1
+            self.last_load_ms = load_ms
+
+    def record_eviction(self):
+        with self.lock:
+            self.evictions += 1
+
+    def record_warmup(self, warmup_ms: float):
+        with self.lock:
+            self.last_warmup_ms = warmup_ms
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            return {
+                'predictions': self.predictions,
+                'errors': self.errors,
+                'mean_latency_ms': round(self.total_latency_ms / self.predictions, 3) if self.predictions else None,
+                'max_latency_ms': round(self.max_latency_ms, 3),
+                'last_latency_ms': round(self.last_latency_ms, 3) if self.last_latency_ms is not None else None,
+                'loads': self.loads,
+                'evictions': self.evictions,
+                'last_load_ms': round(self.last_load_ms, 3) if self.last_load_ms is not None else None,
+                'last_warmup_ms': round(self.last_warmup_ms, 3) if self.last_warmup_ms is not None else None
+            }
+
+
+class ModelRegistry:
+
+    def __init__(self, specs: Dict[str, dict], memory_budget_mb: float):
+        self.specs = specs
+        self.memory_budget_bytes = int(memory_budget_mb * 1024 * 1024)
+        # name -> (model, size in bytes), ordered from least to most recently used
+        self.loaded = OrderedDict()
+        self.resident_bytes = 0
+        self.metrics = {name: ModelMetrics() for name in specs}
+        # guards loaded / resident_bytes, only held for the bookkeeping
+        self.lock = threading.Lock()
+        self.load_locks = {name: threading.Lock() for name in specs}
+
+    def _check_name(self, name: str):
+        if name not in self.specs:
+            raise ModelNotFoundError(name)
+
+    def _evict_for(self, size: int):
+        # evict least recently used models until the new one fits; a model bigger than the
+        # whole budget is still loaded on its own rather than refused
+        while self.loaded and self.resident_bytes + size > self.memory_budget_bytes:
+            evicted_name, (_, evicted_size) = self.loaded.popitem(last=False)
+            self.resident_bytes -= evicted_size
+            self.metrics[evicted_name].record_eviction()
+
+    def _load(self, name: str):
+        # unpickling (and precompiling) is slow, so this runs without the registry lock held
+        start = time.perf_counter()
+        with open(self.specs[name]['path'], 'rb') as f:
+            raw = f.read()
+        model = pickle.loads(raw)
+        size = len(raw)
+
+        if self.specs[name].get('precompiled', PRECOMPILE_MODELS):
+            try:
+                model = CompiledForest(model)
+                size += model.nbytes
+            except Exception as e:
+                print(f"Error precompiling model {name}, serving it uncompiled: {e}")
+
+        with self.lock:
+            self._evict_for(size)
+            self.loaded[name] = (model, size)
+            self.resident_bytes += size
+
+        self.metrics[name].record_load((time.perf_counter() - start) * 1000)
+        return model
+
+    def _get_loaded(self, name: str):
+        with self.lock:
+            if name in self.loaded:
+                self.loaded.move_to_end(name)
+                return self.loaded[name][0]
+        return None
+
+    def get(self, name: str):
+        self._check_name(name)
+        model = self._get_loaded(name)
+        if model is not None:
+            return model
+        # one load per model at a time; requests for other models are not blocked by it
+        with self.load_locks[name]:
+            # another request may have loaded it while this one was waiting
+            model = self._get_loaded(name)
+            if model is not None:
+                return model
+            return self._load(name)
+
+    @staticmethod
+    def _predict_with(model, user_input: dict):
+        if isinstance(model, CompiledForest):
+            return compiled_prediction(model, user_input)
+        return model_prediction(model, user_input)
+
+    def predict(self, name: str, user_input: dict):
+        model = self.get(name)
+        metrics = self.metrics[name]
+        start = time.perf_counter()
+        try:
+            prediction = self._predict_with(model, user_input)
+        except Exception:
+            metrics.record_error()
+            raise
+        metrics.record_prediction((time.perf_counter() - start) * 1000)
+        return prediction
+
+    def warmup(self, name: str):
+        # load the model (if needed) and run one prediction so the first real request does not pay for it
+        model = self.get(name)
+        start = time.perf_counter()
+        self._predict_with(model, WARMUP_INPUT)
+        self.metrics[name].record_warmup((time.perf_counter() - start) * 1000)
+        return self.info(name)
+
+    def is_available(self, name: str) -> bool:
+        # the model can be served (its file is there), whether or not it is loaded right now
+        self._check_name(name)
+        return os.path.exists(self.specs[name]['path'])
+
+    def info(self, name: str) -> dict:
+        self._check_name(name)
+        spec = self.specs[name]
+        with self.lock:
+            loaded = self.loaded.get(name)
+        compiled = loaded is not None and isinstance(loaded[0], CompiledForest)
+        return {
+            'name': name,
+            'version': spec['version'],
+            'description': spec.get('description'),
+            'loaded': loaded is not None,
+            'size_bytes': loaded[1] if loaded else None,
+            'precompiled': loaded[0].info() if compiled else None,
+            'metrics': self.metrics[name].to_dict()
+        }
+
+    def summary(self) -> dict:
+        with self.lock:
+            resident_bytes = self.resident_bytes
+        return {
+            'memory_budget_bytes': self.memory_budget_bytes,
+            'resident_bytes': resident_bytes,
+            'models': [self.info(name) for name in self.specs]
+        }
+
+
+registry = ModelRegistry(MODEL_REGISTRY, MODEL_MEMORY_BUDGET_MB)
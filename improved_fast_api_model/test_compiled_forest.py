@@ -0,0 +1,105 @@
+import os
+import pickle
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from model.compiled_forest import CompiledForest, compiled_prediction
+from model.model import model_prediction
+
+'''
+The precompiled tables must give exactly the same probabilities as model.predict_proba, also for
+inputs that fall right on a tree threshold or next to it once cast to float32.
+'''
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model', 'model.pkl')
+
+
+@pytest.fixture(scope='module')
+def model():
+    with open(MODEL_PATH, 'rb') as f:
+        return pickle.load(f)
+
+
+@pytest.fixture(scope='module')
+def compiled(model):
+    return CompiledForest(model)
+
+
+def edge_values(threshold: float):
+    # the threshold itself and the float32 values around it
+    point = np.float32(threshold)
+    return [
+        float(threshold),
+        float(point),
+        float(np.nextafter(point, np.float32(-np.inf))),
+        float(np.nextafter(point, np.float32(np.inf)))
+    ]
+
+
+def test_identical_to_predict_proba(model, compiled):
+    rng = random.Random(0)
+    x_name, y_name = compiled.numeric
+    rows = []
+    for segment, (x_thresholds, y_thresholds, _) in compiled.segments.items():
+        base = dict(zip(compiled.categorical, segment))
+        for _ in range(20):
+            rows.append(dict(base, **{x_name: rng.uniform(10, 50), y_name: rng.uniform(0.1, 60)}))
+        for threshold in x_thresholds:
+            for value in edge_values(threshold):
+                rows.append(dict(base, **{x_name: value, y_name: rng.uniform(0.1, 60)}))
+        for threshold in y_thresholds:
+            for value in edge_values(threshold):
+                rows.append(dict(base, **{x_name: rng.uniform(10, 50), y_name: value}))
+
+    expected = model.predict_proba(pd.DataFrame(rows, columns=model.feature_names_in_))
+    got = np.array([compiled.predict_proba_one(row) for row in rows])
+
+    assert np.array_equal(expected, got)
+
+
+def test_prediction_matches_pipeline(model, compiled):
+    user_input = {
+        'bmi': 24.2, 'age_group': 'adult', 'lifestyle_risk': 'low',
+        'city_tier': 1, 'income_lpa': 10.0, 'occupation': 'private_job'
+    }
+    assert compiled_prediction(compiled, user_input) == model_prediction(model, user_input)
+    # both build the response from predict_proba, which must pick the same class as model.predict
+    expected_class = model.predict(pd.DataFrame([user_input]))[0]
+    assert model_prediction(model, user_input)['predicted_category'] == expected_class
+
+
+def test_unknown_category_falls_back_to_pipeline(compiled):
+    user_input = {
+        'bmi': 24.2, 'age_group': 'adult', 'lifestyle_risk': 'low',
+        'city_tier': 1, 'income_lpa': 10.0, 'occupation': 'astronaut'
+    }
+    assert compiled.predict_proba_one(user_input) is None
+    # the full pipeline rejects the unknown category like it did before
+    with pytest.raises(ValueError):
+        compiled_prediction(compiled, user_input)
+
+
+def test_transformed_numeric_features_are_rejected():
+    data = pd.DataFrame({
+        'age_group': ['young', 'adult'] * 10,
+        'bmi': np.linspace(18, 35, 20),
+        'income_lpa': np.linspace(1, 40, 20)
+    })
+    pipeline = Pipeline([
+        ('preprocessor', ColumnTransformer([
+            ('cat', OneHotEncoder(), ['age_group']),
+            ('num', StandardScaler(), ['bmi', 'income_lpa'])
+        ])),
+        ('classifier', RandomForestClassifier(n_estimators=3, random_state=42))
+    ])
+    pipeline.fit(data, ['Low', 'High'] * 10)
+
+    with pytest.raises(ValueError):
+        CompiledForest(pipeline)
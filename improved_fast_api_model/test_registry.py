@@ -0,0 +1,105 @@
+import os
+import threading
+
+import pytest
+
+from model.registry import ModelNotFoundError, ModelRegistry
+
+'''
+Lazy loading, LRU eviction and memory accounting of the multi-model registry. Two entries point at the
+same pickle and the budget only fits one and a half of them, so loading one evicts the other.
+'''
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'model', 'model.pkl')
+MODEL_SIZE = os.path.getsize(MODEL_PATH)
+
+USER_INPUT = {
+    'bmi': 24.2, 'age_group': 'adult', 'lifestyle_risk': 'low',
+    'city_tier': 1, 'income_lpa': 10.0, 'occupation': 'private_job'
+}
+
+
+@pytest.fixture
+def registry():
+    specs = {
+        'a': {'path': MODEL_PATH, 'version': '1.0.0', 'precompiled': False},
+        'b': {'path': MODEL_PATH, 'version': '2.0.0', 'precompiled': False}
+    }
+    return ModelRegistry(specs, memory_budget_mb=1.5 * MODEL_SIZE / (1024 * 1024))
+
+
+def test_models_are_loaded_lazily(registry):
+    assert registry.resident_bytes == 0
+    assert not registry.info('a')['loaded']
+
+    registry.predict('a', USER_INPUT)
+
+    assert registry.info('a')['loaded']
+    assert not registry.info('b')['loaded']
+    assert registry.resident_bytes == MODEL_SIZE
+    assert registry.info('a')['metrics']['loads'] == 1
+
+
+def test_least_recently_used_model_is_evicted(registry):
+    registry.get('a')
+    registry.get('b')
+
+    # only one model fits, loading b evicted a
+    assert list(registry.loaded) == ['b']
+    assert registry.resident_bytes == MODEL_SIZE
+    assert registry.info('a')['metrics']['evictions'] == 1
+    assert registry.info('b')['metrics']['evictions'] == 0
+
+    # using a again loads it back and evicts b
+    registry.predict('a', USER_INPUT)
+    assert list(registry.loaded) == ['a']
+    assert registry.resident_bytes == MODEL_SIZE
+    assert registry.info('a')['metrics']['loads'] == 2
+    assert registry.info('b')['metrics']['evictions'] == 1
+
+    summary = registry.summary()
+    assert summary['resident_bytes'] == MODEL_SIZE
+    assert summary['resident_bytes'] <= summary['memory_budget_bytes']
+
+
+def test_loaded_model_is_not_reloaded(registry):
+    model = registry.get('a')
+    assert registry.get('a') is model
+    assert registry.info('a')['metrics']['loads'] == 1
+
+
+def test_concurrent_first_requests_load_once(registry):
+    barrier = threading.Barrier(8)
+    models = []
+
+    def get():
+        barrier.wait()
+        models.append(registry.get('a'))
+
+    threads = [threading.Thread(target=get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert registry.info('a')['metrics']['loads'] == 1
+    assert all(model is models[0] for model in models)
+
+
+def test_prediction_metrics(registry):
+    registry.predict('a', USER_INPUT)
+    registry.predict('a', USER_INPUT)
+    with pytest.raises(ValueError):
+        registry.predict('a', dict(USER_INPUT, occupation='astronaut'))
+
+    metrics = registry.info('a')['metrics']
+    assert metrics['predictions'] == 2
+    assert metrics['errors'] == 1
+    assert metrics['mean_latency_ms'] > 0
+    assert metrics['max_latency_ms'] >= metrics['mean_latency_ms']
+    assert metrics['last_load_ms'] > 0
+
+
+def test_unknown_model(registry):
+    with pytest.raises(ModelNotFoundError):
+        registry.get('missing')
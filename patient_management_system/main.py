@@ -3,6 +3,7 @@ from fastapi.responses import JSONResponse
 import json
 from pydantic import BaseModel, Field, computed_field
 from typing import Annotated, Literal, Optional
+from patient_stats import PatientStats, data_lock
 
 app = FastAPI()
 
@@ -53,6 +54,9 @@ def save_data(data):
     with open('patient.json', 'w') as f:
         json.dump(data, f)
 
+# aggregates are built once from the file and then kept up to date by create / edit / delete
+stats = PatientStats.recompute(load_data())
+
 
 @app.get("/")
 def read_root():
@@ -109,21 +113,30 @@ def sort_patients(sort_by : str = Query(..., description="Sort by [weight, heigh
     return sorted_data
 
 
+@app.get('/stats')
+def patient_stats():
+    return stats.snapshot()
+
+
 @app.post('/create/')
 def create_patient(patient: Patient):
-    # load existing data
-    data = load_data()
-
-    #check if patient id already exists
-    if patient.id in data:
-        # if exists return error message
-        raise HTTPException(status_code=400, detail=f"Patient with id {patient.id} already exists.")
+    # one request at a time reads, changes and saves patient.json and updates the stats,
+    # otherwise concurrent writes can overwrite each other and the stats drift from the file
+    with data_lock:
+        # load existing data
+        data = load_data()
+
+        #check if patient id already exists
+        if patient.id in data:
+            # if exists return error message
+            raise HTTPException(status_code=400, detail=f"Patient with id {patient.id} already exists.")
     
-    # if not exists add the new patient to the data
-    data[patient.id] = patient.model_dump(exclude=['id'])
+        # if not exists add the new patient to the data
+        data[patient.id] = patient.model_dump(exclude=['id'])
     
-    # save the updated data back to the json file
-    save_data(data)
+        # save the updated data back to the json file
+        save_data(data)
+        stats.add(data[patient.id])
     
     # return success message with patient details
     return JSONResponse(status_code = 201, content = {'message': 'Patient created successfully', 'patient': data[patient.id]})
@@ -131,43 +144,51 @@ def create_patient(patient: Patient):
 
 @app.put('/edit/{patient_id}')
 def edit_patient(patient_id: str, patient_update: PatientUpdate):
-    #load existing data
-    data = load_data()
-
-    # check if patient id exists
-    if patient_id not in data: 
-        raise HTTPException(status_code = 404, detail = f"Patient with ID {patient_id} not found.")
+    # same as create_patient, serialize the read-modify-save and the stats update
+    with data_lock:
+        #load existing data
+        data = load_data()
+
+        # check if patient id exists
+        if patient_id not in data: 
+            raise HTTPException(status_code = 404, detail = f"Patient with ID {patient_id} not found.")
     
-    #update only the fields that are provided in the request
-    existing_patient_info = data[patient_id]
-    updated_patient_info = patient_update.model_dump(exclude_unset=True)
+        #update only the fields that are provided in the request
+        existing_patient_info = data[patient_id]
+        # keep a copy of the old record, the loop below updates it in place
+        old_patient_info = dict(existing_patient_info)
+        updated_patient_info = patient_update.model_dump(exclude_unset=True)
 
-    for key, value in updated_patient_info.items():
-        existing_patient_info[key] = value
+        for key, value in updated_patient_info.items():
+            existing_patient_info[key] = value
 
-    existing_patient_info['id'] = patient_id
-    patient_pydantic_object = Patient(**existing_patient_info)
+        existing_patient_info['id'] = patient_id
+        patient_pydantic_object = Patient(**existing_patient_info)
 
-    existing_patient_info = patient_pydantic_object.model_dump(exclude={'id'})
+        existing_patient_info = patient_pydantic_object.model_dump(exclude={'id'})
 
-    data[patient_id] = existing_patient_info
+        data[patient_id] = existing_patient_info
 
-    save_data(data)
+        save_data(data)
+        stats.update(old_patient_info, existing_patient_info)
     return JSONResponse(status_code=200, content={'message': 'Patient information updated successfully', 'patient': data[patient_id]})
 
 @app.delete('/delete/{patient_id}')
 def delete_patient(patient_id: str):
-    # load existing data
-    data = load_data()
+    # same as create_patient, serialize the read-modify-save and the stats update
+    with data_lock:
+        # load existing data
+        data = load_data()
 
-    #check if patient id exists or not
-    if patient_id not in data:
-        raise HTTPException(status_code = 404, detail = f"Patient with id {patient_id} not found.")
+        #check if patient id exists or not
+        if patient_id not in data:
+            raise HTTPException(status_code = 404, detail = f"Patient with id {patient_id} not found.")
 
-    #if exists delete the patient
-    deleted_data = data.pop(patient_id)
+        #if exists delete the patient
+        deleted_data = data.pop(patient_id)
 
-    save_data(data)
+        save_data(data)
+        stats.remove(deleted_data)
 
     #return response message
     return JSONResponse(status_code=200, content={'message': 'Patient deleted successfully', 'patient': deleted_data})
\ No newline at end of file
@@ -0,0 +1,103 @@
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Dict, List, Optional
+
+'''
+Running aggregates over the patient records so that '/stats' does not have to
+load and scan the whole patient.json file on every request.
+
+Every create, edit and delete calls add() / remove() with the stored record, so the
+aggregates always describe the current data. Reading them back is O(1) in the number
+of patients (the histograms only grow with the number of distinct categories/cities).
+
+BMI values are stored rounded to 2 decimals, so the running sum is kept as an integer
+number of hundredths. This keeps the mean exact no matter how many add/remove calls
+happened, which is what lets recompute() be compared with == in the consistency check.
+
+FastAPI runs the sync handlers in a threadpool, so the write handlers hold data_lock for the whole
+load -> modify -> save -> stats update sequence, and snapshot() takes it too. It is reentrant so a
+handler holding it can still read the stats.
+'''
+
+data_lock = threading.RLock()
+
+
+def _bmi_hundredths(record: dict) -> int:
+    return round(record['bmi'] * 100)
+
+
+def _bmi_category(record: dict) -> str:
+    # older records in patient.json store the category under 'verdict'
+    return record.get('bmi_category', record.get('verdict', 'Unknown'))
+
+
+class PatientStats:
+
+    def __init__(self):
+        self.count = 0
+        self.bmi_total = 0
+        # kept sorted so min / max are just the two ends of the list
+        self.bmi_sorted: List[int] = []
+        self.bmi_category = Counter()
+        self.city = Counter()
+        self.gender = Counter()
+
+    @classmethod
+    def recompute(cls, data: Dict[str, dict]) -> 'PatientStats':
+        stats = cls()
+        for record in data.values():
+            stats.add(record)
+        return stats
+
+    def add(self, record: dict):
+        bmi = _bmi_hundredths(record)
+        self.count += 1
+        self.bmi_total += bmi
+        insort(self.bmi_sorted, bmi)
+        self.bmi_category[_bmi_category(record)] += 1
+        self.city[record['city']] += 1
+        self.gender[record['gender']] += 1
+
+    def remove(self, record: dict):
+        bmi = _bmi_hundredths(record)
+        self.count -= 1
+        self.bmi_total -= bmi
+        del self.bmi_sorted[bisect_left(self.bmi_sorted, bmi)]
+        self._decrement(self.bmi_category, _bmi_category(record))
+        self._decrement(self.city, record['city'])
+        self._decrement(self.gender, record['gender'])
+
+    def update(self, old_record: dict, new_record: dict):
+        self.remove(old_record)
+        self.add(new_record)
+
+    @staticmethod
+    def _decrement(counter: Counter, key: str):
+        counter[key] -= 1
+        # drop empty buckets so the histograms only list categories that exist
+        if counter[key] == 0:
+            del counter[key]
+
+    def _bmi_summary(self) -> Dict[str, Optional[float]]:
+        if self.count == 0:
+            return {'mean': None, 'min': None, 'max': None}
+        return {
+            'mean': round(self.bmi_total / self.count / 100, 2),
+            'min': self.bmi_sorted[0] / 100,
+            'max': self.bmi_sorted[-1] / 100
+        }
+
+    def snapshot(self) -> dict:
+        with data_lock:
+            return {
+                'count': self.count,
+                'bmi': self._bmi_summary(),
+                'bmi_category': dict(self.bmi_category),
+                'city': dict(self.city),
+                'gender': dict(self.gender)
+            }
+
+    def is_consistent_with(self, data: Dict[str, dict]) -> bool:
+        # recompute from scratch and compare, used to check that the incremental updates did not drift
+        return self.snapshot() == PatientStats.recompute(data).snapshot()
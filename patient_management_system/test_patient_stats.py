@@ -0,0 +1,90 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi.testclient import TestClient
+
+from patient_stats import PatientStats
+
+'''
+Checks that the incrementally maintained /stats aggregates always match a recompute from scratch.
+The app reads and writes patient.json in the working directory, so every test runs on a copy of it.
+'''
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'patient.json')
+
+
+@pytest.fixture
+def app_module(tmp_path, monkeypatch):
+    shutil.copy(DATA_FILE, tmp_path / 'patient.json')
+    monkeypatch.chdir(tmp_path)
+    import main
+    # rebuild the aggregates from the copied file, main builds them once at import
+    main.stats = PatientStats.recompute(main.load_data())
+    return main
+
+
+@pytest.fixture
+def client(app_module):
+    return TestClient(app_module.app)
+
+
+def assert_consistent(app_module):
+    assert app_module.stats.is_consistent_with(app_module.load_data())
+
+
+def test_create_edit_delete_keep_stats_consistent(app_module, client):
+    assert_consistent(app_module)
+
+    response = client.post('/create/', json={
+        'id': 'P100', 'name': 'Test Patient', 'age': 30, 'city': 'Pune',
+        'gender': 'Male', 'weight': 70, 'height': 1.75
+    })
+    assert response.status_code == 201
+    assert_consistent(app_module)
+    assert client.get('/stats').json()['city']['Pune'] == 2
+
+    # Normal -> Obese, and moves the patient to another city
+    response = client.put('/edit/P100', json={'weight': 110, 'city': 'Delhi'})
+    assert response.status_code == 200
+    assert response.json()['patient']['bmi_category'] == 'Obese'
+    assert_consistent(app_module)
+    stats = client.get('/stats').json()
+    assert stats['city']['Pune'] == 1
+    assert stats['city']['Delhi'] == 1
+
+    response = client.delete('/delete/P100')
+    assert response.status_code == 200
+    assert_consistent(app_module)
+    assert 'Delhi' not in client.get('/stats').json()['city']
+
+
+def test_delete_all_patients(app_module, client):
+    for patient_id in list(app_module.load_data()):
+        assert client.delete(f'/delete/{patient_id}').status_code == 200
+        assert_consistent(app_module)
+
+    assert client.get('/stats').json() == {
+        'count': 0,
+        'bmi': {'mean': None, 'min': None, 'max': None},
+        'bmi_category': {},
+        'city': {},
+        'gender': {}
+    }
+
+
+def test_concurrent_creates_are_not_lost(app_module, client):
+    before = len(app_module.load_data())
+
+    def create(i):
+        return client.post('/create/', json={
+            'id': f'C{i:03d}', 'name': 'Concurrent Patient', 'age': 40, 'city': 'Pune',
+            'gender': 'Female', 'weight': 60 + i, 'height': 1.65
+        }).status_code
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        assert list(pool.map(create, range(20))) == [201] * 20
+
+    assert len(app_module.load_data()) == before + 20
+    assert_consistent(app_module)